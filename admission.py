@@ -0,0 +1,137 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of time before or during a downstream call"""
+    pass
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed before doing any work"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class Deadline:
+    """Absolute point in time by which a request must be finished"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, operation: str, min_remaining: float = 0.0):
+        """
+        Raise DeadlineExceeded if less than min_remaining seconds are left
+        to start an operation.
+        """
+        if self.expired() or self.remaining() < min_remaining:
+            raise DeadlineExceeded(f"Deadline of {self.timeout:.1f}s cannot be met for {operation}")
+
+class AdmissionController:
+    """
+    Per-worker admission queue for expensive requests.
+    At most max_concurrent requests run at once and at most max_queue wait
+    for a slot. Requests that would have to queue are shed with 429 when the
+    queue is full, and with 503 when the expected wait plus service time
+    would overrun their deadline.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, smoothing: float = 0.2):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.smoothing = smoothing
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+        self._in_flight = 0
+        self._avg_service_time = 0.0
+        self._avg_queue_wait = 0.0
+        self._max_queue_wait = 0.0
+        self._admitted = 0
+        self._shed_queue_full = 0
+        self._shed_deadline = 0
+
+    def has_free_slot(self) -> bool:
+        """True if a new request would start immediately without queueing"""
+        return self._in_flight < self.max_concurrent and self._waiting == 0
+
+    def estimated_wait(self) -> float:
+        """Expected time in seconds before a newly queued request gets a slot"""
+        if self.has_free_slot():
+            return 0.0
+        rounds = self._waiting // self.max_concurrent + 1
+        return rounds * self._avg_service_time
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait()))
+
+    def _ewma(self, average: float, value: float) -> float:
+        if average == 0.0:
+            return value
+        return (1 - self.smoothing) * average + self.smoothing * value
+
+    @asynccontextmanager
+    async def admit(self, deadline: Deadline):
+        """
+        Wait for a slot, yielding the time spent queued in seconds.
+        Raises AdmissionRejected if the request should be shed instead.
+        A request with a free slot is always admitted, so a service time
+        average inflated by a few slow requests can't lock out an idle worker.
+        """
+        if not self.has_free_slot():
+            if self._waiting >= self.max_queue:
+                self._shed_queue_full += 1
+                raise AdmissionRejected(429, "Server is busy, admission queue is full", self._retry_after())
+
+            if self.estimated_wait() + self._avg_service_time > deadline.remaining():
+                self._shed_deadline += 1
+                raise AdmissionRejected(503, "Request cannot be completed within its deadline", self._retry_after())
+
+        queued_at = time.monotonic()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            self._shed_deadline += 1
+            raise AdmissionRejected(503, "Request deadline expired while queued", self._retry_after())
+        finally:
+            self._waiting -= 1
+
+        started_at = time.monotonic()
+        queue_wait = started_at - queued_at
+        self._avg_queue_wait = self._ewma(self._avg_queue_wait, queue_wait)
+        self._max_queue_wait = max(self._max_queue_wait, queue_wait)
+        self._admitted += 1
+        self._in_flight += 1
+        try:
+            yield queue_wait
+        finally:
+            self._in_flight -= 1
+            self._avg_service_time = self._ewma(self._avg_service_time, time.monotonic() - started_at)
+            self._semaphore.release()
+
+    def stats(self) -> Dict:
+        """Snapshot of queue state and counters for this worker"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "admitted": self._admitted,
+            "shed_queue_full": self._shed_queue_full,
+            "shed_deadline": self._shed_deadline,
+            "avg_queue_wait_ms": round(self._avg_queue_wait * 1000, 1),
+            "max_queue_wait_ms": round(self._max_queue_wait * 1000, 1),
+            "avg_service_time_ms": round(self._avg_service_time * 1000, 1)
+        }
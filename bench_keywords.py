@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Speed and agreement benchmark for the keyword engines.
+
+Times the NLTK, fast and fallback engines on a small corpus of news-style
+texts and scores how closely the fast engine matches the NLTK path, both on
+the final keywords and on the per-token noun decision.
+"""
+import argparse
+import re
+import time
+
+import keyword_extractor
+from keyword_extractor import (
+    extract_keywords, extract_keywords_fast, extract_keywords_fallback, _is_probable_noun
+)
+
+CORPUS = [
+    "Machine learning and artificial intelligence are transforming modern software development. "
+    "These technologies enable developers to build more intelligent applications that can process "
+    "natural language, recognize patterns, and make data-driven decisions.",
+    "The city council approved a new budget on Tuesday that increases funding for public schools "
+    "and road repairs. Several residents criticized the plan, arguing that property taxes would rise.",
+    "Researchers at the university published a study showing that regular exercise improves memory "
+    "in older adults. Participants who walked three times a week performed better on cognitive tests.",
+    "The company reported record revenue for the third quarter, driven by strong demand for its cloud "
+    "services. Shares rose sharply in early trading as investors welcomed the results.",
+    "Heavy rain caused flooding across the region, forcing hundreds of families to leave their homes. "
+    "Emergency crews worked through the night to rescue stranded drivers and restore power.",
+    "The new smartphone features a larger battery, an improved camera and a faster processor. "
+    "Reviewers praised the display but noted that the price remains high compared with rivals.",
+    "Doctors warn that antibiotic resistance is becoming a serious threat to global health. "
+    "Hospitals are seeing more infections that no longer respond to standard treatment.",
+    "The football team won the championship after a dramatic penalty shootout. Fans celebrated in "
+    "the streets while the coach thanked the players for their determination throughout the season.",
+    "Climate scientists say that rising ocean temperatures are damaging coral reefs around the world. "
+    "Conservation groups are calling for stricter limits on carbon emissions and coastal development.",
+    "The museum opened an exhibition of paintings by local artists, with works exploring memory, "
+    "migration and identity. Admission is free for students and visitors under eighteen.",
+    "Engineers are testing a new design for electric vehicle batteries that charges in minutes. "
+    "If the prototype succeeds, the technology could reduce costs for manufacturers and drivers.",
+    "Customers complained about long delays at the airport after a software failure disrupted "
+    "check-in systems. The airline apologized and promised compensation for cancelled flights.",
+]
+
+NLTK_SETUP_HINT = (
+    "python -m nltk.downloader punkt_tab stopwords averaged_perceptron_tagger_eng "
+    "(NLTK < 3.9 uses punkt and averaged_perceptron_tagger instead)"
+)
+
+def nltk_unavailable_reason() -> str:
+    """
+    Run the same tokenizer, stopword and tagger calls as the NLTK engine.
+    Returns None if they all work, otherwise the error. Checking resource
+    names directly would break across NLTK releases, which renamed them.
+    """
+    if not keyword_extractor.NLTK_AVAILABLE:
+        return "NLTK is not installed"
+    try:
+        keyword_extractor.stopwords.words('english')
+        keyword_extractor.pos_tag(keyword_extractor.word_tokenize("data test"))
+        return None
+    except LookupError as e:
+        missing = re.search(r"Resource \S+ not found", str(e))
+        return missing.group(0) if missing else str(e)
+    except Exception as e:
+        return str(e)
+
+def time_engine(func, texts: list, repeats: int) -> float:
+    """Mean microseconds per document"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            func(text, 3)
+    return (time.perf_counter() - start) / (repeats * len(texts)) * 1e6
+
+def token_agreement(texts: list) -> float:
+    """Share of tokens where the fast noun check agrees with the NLTK tag"""
+    stop_words = set(keyword_extractor.stopwords.words('english'))
+    agree = total = 0
+    for text in texts:
+        tokens = [
+            t for t in keyword_extractor.word_tokenize(text.lower())
+            if t.isalpha() and t not in stop_words and len(t) > 2
+        ]
+        for word, pos in keyword_extractor.pos_tag(tokens):
+            agree += (pos in ('NN', 'NNS', 'NNP', 'NNPS')) == _is_probable_noun(word)
+            total += 1
+    return agree / total if total else 0.0
+
+def keyword_agreement(texts: list, num_keywords: int) -> tuple:
+    """Mean overlap and Jaccard similarity of fast keywords against NLTK keywords"""
+    overlap = jaccard = 0.0
+    for text in texts:
+        reference = set(extract_keywords(text, num_keywords, engine="nltk"))
+        candidate = set(extract_keywords_fast(text, num_keywords))
+        if reference:
+            overlap += len(reference & candidate) / len(reference)
+        union = reference | candidate
+        jaccard += len(reference & candidate) / len(union) if union else 1.0
+    return overlap / len(texts), jaccard / len(texts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    fast_us = time_engine(extract_keywords_fast, CORPUS, args.repeats)
+    fallback_us = time_engine(extract_keywords_fallback, CORPUS, args.repeats)
+    print(f"fast:     {fast_us:8.1f} us/doc")
+    print(f"fallback: {fallback_us:8.1f} us/doc")
+
+    reason = nltk_unavailable_reason()
+    if reason:
+        print(f"nltk:     unavailable ({reason})")
+        print(f"Install the NLTK data to score agreement: {NLTK_SETUP_HINT}")
+        return
+
+    nltk_us = time_engine(lambda text, k: extract_keywords(text, k, engine="nltk"), CORPUS, args.repeats)
+    overlap, jaccard = keyword_agreement(CORPUS, args.k)
+    print(f"nltk:     {nltk_us:8.1f} us/doc ({nltk_us / fast_us:.0f}x slower than fast)")
+    print(f"Top-{args.k} keyword overlap with nltk: {overlap:.0%} (Jaccard {jaccard:.2f})")
+    print(f"Per-token noun agreement with nltk: {token_agreement(CORPUS):.0%}")
+
+if __name__ == "__main__":
+    main()
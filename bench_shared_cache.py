@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Cross-worker hit-rate benchmark for the shared cache.
+
+Starts several worker processes that each serve requests for keys drawn
+from a Zipf-like distribution, as repeated /analyze submissions would.
+On a miss the worker stores the result. The same load is run against a
+per-process dict (what each gunicorn worker has today) and against the
+SQLite-backed SharedCache.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from shared_cache import SharedCache
+
+def request_keys(worker: int, requests: int, distinct: int, skew: float) -> list:
+    rng = random.Random(worker)
+    weights = [1.0 / (rank + 1) ** skew for rank in range(distinct)]
+    return [f"text-{k}" for k in rng.choices(range(distinct), weights=weights, k=requests)]
+
+def local_worker(worker, requests, distinct, skew, barrier, results):
+    cache = {}
+    hits = 0
+    barrier.wait()
+    for key in request_keys(worker, requests, distinct, skew):
+        if key in cache:
+            hits += 1
+        else:
+            cache[key] = {"summary": key}
+    results.put((hits, 0.0))
+
+def shared_worker(worker, requests, distinct, skew, barrier, results, path):
+    cache = SharedCache(path)
+    hits = 0
+    keys = request_keys(worker, requests, distinct, skew)
+    barrier.wait()
+    start = time.perf_counter()
+    for key in keys:
+        if cache.get("llm", key) is not None:
+            hits += 1
+        else:
+            cache.set("llm", key, {"summary": key}, ttl=3600)
+    results.put((hits, time.perf_counter() - start))
+
+def run(mode: str, workers: int, requests: int, distinct: int, skew: float) -> dict:
+    path = tempfile.mkdtemp(prefix="shared_cache_bench_")
+    try:
+        db_path = os.path.join(path, "cache.db")
+        SharedCache(db_path)
+        barrier = multiprocessing.Barrier(workers)
+        results = multiprocessing.Queue()
+        target = local_worker if mode == "local" else shared_worker
+        extra = () if mode == "local" else (db_path,)
+        processes = [
+            multiprocessing.Process(target=target, args=(w, requests, distinct, skew, barrier, results) + extra)
+            for w in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        hits = sum(h for h, _ in outcomes)
+        elapsed = sum(t for _, t in outcomes)
+        return {
+            "hit_rate": hits / (workers * requests),
+            "us_per_op": elapsed / (workers * requests) * 1e6
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=5000, help="requests per worker")
+    parser.add_argument("--distinct", type=int, default=5000, help="distinct texts")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent")
+    args = parser.parse_args()
+
+    local = run("local", args.workers, args.requests, args.distinct, args.skew)
+    shared = run("shared", args.workers, args.requests, args.distinct, args.skew)
+    print(f"{args.workers} workers x {args.requests} requests over {args.distinct} distinct texts (zipf {args.skew})")
+    print(f"Per-process cache hit rate: {local['hit_rate']:.1%}")
+    print(f"Shared cache hit rate:      {shared['hit_rate']:.1%} ({shared['us_per_op']:.0f} us per lookup/store)")
+    print(f"LLM calls saved by sharing: {(shared['hit_rate'] - local['hit_rate']) * args.workers * args.requests:.0f}")
+
+if __name__ == "__main__":
+    main()
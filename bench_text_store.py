@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Storage-size benchmark for the text_blobs store.
+
+Builds a corpus of article-like texts where a share of submissions are
+repeats (the same text analysed several times), then compares storing
+original_text inline on every analyses row against the deduplicated
+text_blobs layout.
+
+Both layouts keep the text in a Postgres TEXT column, which TOAST
+compresses once a value passes about 2 KB. The benchmark models that on
+both sides, with zlib standing in for pglz, so the ratio it reports comes
+from deduplication rather than compression. zlib compresses better than
+pglz, which shrinks both sides alike.
+
+The texts are synthetic: words follow a Zipf distribution over a 20k-word
+vocabulary, but there is no grammar or topical structure. To measure a
+real database instead, compare:
+
+    SELECT sum(pg_column_size(original_text)) FROM analyses;
+    SELECT sum(pg_column_size(content)) + count(*) * 65 FROM text_blobs;
+"""
+import argparse
+import json
+import random
+import zlib
+
+from text_store import make_blob
+
+FUNCTION_WORDS = (
+    "the a of and to in is that for on with as by this are was be it from at "
+    "an or but not have has had were which their they we its more will can"
+).split()
+SYLLABLES = (
+    "ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo fu ga ge gi go gu "
+    "la le li lo lu ma me mi mo mu na ne ni no nu pa pe pi po pu ra re ri ro ru "
+    "sa se si so su ta te ti to tu va ve vi vo vu tion ment ing er al ic ous"
+).split()
+VOCABULARY_SIZE = 20000
+# TOAST compresses values once a row passes about 2 KB
+TOAST_THRESHOLD = 2032
+# On-disk size of a CHAR(64) text_hash reference
+REFERENCE_BYTES = 65
+
+def build_vocabulary(rng: random.Random) -> tuple:
+    """
+    A 20k-word vocabulary with Zipf-distributed frequencies, roughly the shape
+    of English prose, plus frequent function words. A tiny vocabulary would
+    compress far better than real text and overstate the savings.
+    """
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))))
+    content_words = sorted(words)
+    rng.shuffle(content_words)
+    vocabulary = FUNCTION_WORDS + content_words
+    cumulative = []
+    total = 0.0
+    for rank in range(len(vocabulary)):
+        total += 1.0 / (rank + 1)
+        cumulative.append(total)
+    return vocabulary, cumulative
+
+def make_document(rng: random.Random, vocabulary: tuple) -> str:
+    """Generate a multi-paragraph text drawn from the Zipf vocabulary"""
+    words, cumulative = vocabulary
+    paragraphs = []
+    for _ in range(rng.randint(2, 8)):
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            sentence = rng.choices(words, cum_weights=cumulative, k=rng.randint(8, 25))
+            sentences.append(" ".join(sentence).capitalize() + ".")
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+def build_corpus(size: int, duplicate_rate: float, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    vocabulary = build_vocabulary(rng)
+    corpus = []
+    for _ in range(size):
+        if corpus and rng.random() < duplicate_rate:
+            corpus.append(rng.choice(corpus))
+        else:
+            corpus.append(make_document(rng, vocabulary))
+    return corpus
+
+def stored_size(text: str) -> int:
+    """Approximate on-disk size of a TEXT value after TOAST compression"""
+    raw = text.encode("utf-8")
+    if len(raw) <= TOAST_THRESHOLD:
+        return len(raw) + 4
+    return min(len(raw), len(zlib.compress(raw))) + 8
+
+def run(size: int, duplicate_rate: float) -> dict:
+    corpus = build_corpus(size, duplicate_rate)
+
+    inline_bytes = sum(stored_size(text) for text in corpus)
+
+    blobs = {}
+    for text in corpus:
+        blob = make_blob(text)
+        blobs.setdefault(blob["hash"], blob)
+    blob_bytes = sum(stored_size(blob["content"]) + REFERENCE_BYTES for blob in blobs.values())
+    reference_bytes = size * REFERENCE_BYTES
+
+    # Per-row metadata payload with and without original_text in the select
+    metadata = json.dumps({
+        "id": 1, "summary": "x" * 200, "title": "x" * 40,
+        "topics": ["topic"] * 3, "sentiment": "neutral",
+        "keywords": ["keyword"] * 3, "created_at": "2024-01-01T00:00:00+00:00"
+    }).encode("utf-8")
+    raw_text_bytes = sum(len(json.dumps(text).encode("utf-8")) for text in corpus)
+    list_inline = size * len(metadata) + raw_text_bytes
+    list_lazy = size * (len(metadata) + len(json.dumps("0" * 64)))
+
+    return {
+        "documents": size,
+        "distinct_texts": len(blobs),
+        "inline_mb": inline_bytes / 1e6,
+        "blob_mb": (blob_bytes + reference_bytes) / 1e6,
+        "storage_ratio": inline_bytes / (blob_bytes + reference_bytes),
+        "dedup_ratio": size / len(blobs),
+        "list_payload_inline_mb": list_inline / 1e6,
+        "list_payload_lazy_mb": list_lazy / 1e6,
+        "avg_text_kb": raw_text_bytes / size / 1e3
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    result = run(args.size, args.duplicate_rate)
+    print(f"Documents:            {result['documents']} ({result['distinct_texts']} distinct, "
+          f"avg {result['avg_text_kb']:.1f} KB)")
+    print(f"Inline original_text: {result['inline_mb']:.2f} MB (TOAST-compressed)")
+    print(f"text_blobs + refs:    {result['blob_mb']:.2f} MB ({result['storage_ratio']:.2f}x smaller, "
+          f"{result['dedup_ratio']:.2f}x from deduplication)")
+    print(f"List payload inline:  {result['list_payload_inline_mb']:.2f} MB")
+    print(f"List payload lazy:    {result['list_payload_lazy_mb']:.2f} MB")
+
+if __name__ == "__main__":
+    main()
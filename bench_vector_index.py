@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Query-latency benchmark for the local similarity index.
+
+Fills a memory-mapped VectorIndex with synthetic analyses, times search()
+for a mix of single-word and phrase queries, and checks that words outside
+the corpus vocabulary match nothing.
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from vector_index import VectorIndex, DEFAULT_MAX_TERMS
+
+TOPICS = [
+    "machine learning", "artificial intelligence", "climate change", "public health",
+    "software development", "financial markets", "renewable energy", "data privacy",
+    "education policy", "supply chain", "cloud computing", "clinical trials",
+    "urban planning", "cyber security", "space exploration", "mental health"
+]
+WORDS = (
+    "model data network system research team company market product customer "
+    "revenue growth report government policy city water school student software "
+    "developer application platform service user analysis result study patient "
+    "treatment science technology industry energy budget council hospital"
+).split()
+QUERIES = ["ML", "machine learning", "energy", "data privacy", "patients", "AI", "budget council"]
+OUT_OF_VOCABULARY = ["zebra", "giraffe", "quantum"]
+
+def make_analysis(analysis_id: int, rng: random.Random) -> dict:
+    return {
+        "id": analysis_id,
+        "summary": " ".join(rng.choices(WORDS, k=rng.randint(15, 40))),
+        "topics": rng.sample(TOPICS, 3),
+        "keywords": rng.sample(WORDS, 3)
+    }
+
+def fill(index: VectorIndex, rows: int, batch: int = 50000, seed: int = 42):
+    """
+    Vectorize a pool of distinct analyses and append it repeatedly until the
+    index holds `rows` rows. Vectorizing every row individually would only
+    measure Python tokenization, not the query path this benchmark is about.
+    """
+    rng = random.Random(seed)
+    pool = [make_analysis(i, rng) for i in range(min(batch, rows))]
+    ids, terms, weights = index._vectorize(pool)
+    added = 0
+    while added < rows:
+        take = min(len(pool), rows - added)
+        index._append(ids[:take] + added, terms[:take], weights[:take])
+        added += take
+
+def run(rows: int, max_terms: int, k: int, repeats: int) -> dict:
+    path = tempfile.mkdtemp(prefix="vector_index_bench_")
+    try:
+        index = VectorIndex(path, max_terms=max_terms)
+        start = time.perf_counter()
+        fill(index, rows)
+        build_seconds = time.perf_counter() - start
+
+        for query in QUERIES:
+            index.search(query, k)
+
+        latencies = []
+        for _ in range(repeats):
+            for query in QUERIES:
+                start = time.perf_counter()
+                index.search(query, k)
+                latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        row_bytes = max_terms * (np.dtype(np.uint32).itemsize + np.dtype(np.float32).itemsize)
+        return {
+            "rows": rows,
+            "max_terms": max_terms,
+            "matrix_mb": rows * (row_bytes + np.dtype(np.int64).itemsize) / 1e6,
+            "out_of_vocabulary_hits": sum(len(index.search(query, k)) for query in OUT_OF_VOCABULARY),
+            "build_seconds": build_seconds,
+            "p50_ms": statistics.median(latencies),
+            "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--max-terms", type=int, default=DEFAULT_MAX_TERMS)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        result = run(rows, args.max_terms, args.k, args.repeats)
+        print(f"{result['rows']:>9} rows x {result['max_terms']} terms ({result['matrix_mb']:.0f} MB): "
+              f"build {result['build_seconds']:.1f}s, "
+              f"query p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+              f"out-of-vocabulary hits {result['out_of_vocabulary_hits']}")
+
+if __name__ == "__main__":
+    main()
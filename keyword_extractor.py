@@ -4,6 +4,8 @@ import nltk
 import ssl
 import os
 
+from profiling import profiled
+
 try:
     _create_unverified_https_context = ssl._create_unverified_context
 except AttributeError:
@@ -22,6 +24,16 @@ def download_nltk_data():
         except Exception as e:
             print(f"Warning: Could not download punkt tokenizer: {e}")
 
+    # NLTK 3.9+ loads punkt_tab and averaged_perceptron_tagger_eng instead
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+    except LookupError:
+        try:
+            print("Downloading NLTK punkt_tab tokenizer...")
+            nltk.download('punkt_tab', quiet=True)
+        except Exception as e:
+            print(f"Warning: Could not download punkt_tab tokenizer: {e}")
+
     try:
         nltk.data.find('corpora/stopwords')
     except LookupError:
@@ -40,6 +52,15 @@ def download_nltk_data():
         except Exception as e:
             print(f"Warning: Could not download POS tagger: {e}")
 
+    try:
+        nltk.data.find('taggers/averaged_perceptron_tagger_eng')
+    except LookupError:
+        try:
+            print("Downloading NLTK English POS tagger...")
+            nltk.download('averaged_perceptron_tagger_eng', quiet=True)
+        except Exception as e:
+            print(f"Warning: Could not download English POS tagger: {e}")
+
 download_nltk_data()
 
 try:
@@ -75,14 +96,117 @@ def extract_keywords_fallback(text: str, num_keywords: int = 3) -> list:
     
     return [word for word, count in word_counts.most_common(num_keywords)]
 
-def extract_keywords(text: str, num_keywords: int = 3) -> list:
+# Keyword engine used by extract_keywords: "nltk" (POS-tagged nouns) or
+# "fast" (regex tokenizer, lexicon and suffix heuristics, no tagger)
+KEYWORD_ENGINES = ("nltk", "fast")
+
+def _configured_engine(value: str) -> str:
+    """Validate a KEYWORD_ENGINE setting, warning and using nltk if it is unknown"""
+    engine = value.strip().lower()
+    if engine not in KEYWORD_ENGINES:
+        print(f"Warning: unknown KEYWORD_ENGINE {value!r}, expected one of {KEYWORD_ENGINES}; using 'nltk'")
+        return "nltk"
+    return engine
+
+KEYWORD_ENGINE = _configured_engine(os.getenv("KEYWORD_ENGINE", "nltk"))
+
+_FAST_TOKEN_PATTERN = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+# Stopwords plus frequent verbs, adjectives and adverbs that the suffix
+# rules below don't catch. Kept small on purpose; anything not listed here
+# and not matching a non-noun suffix is treated as a noun.
+_NON_NOUNS = frozenset("""
+    a about above after again against all am an and any are as at be because been before being
+    below between both but by can did do does doing down during each few
+    for from further had has have having he her here hers herself him himself his
+    how i if in into is it its itself just me more most my myself no nor not now of off on
+    once only or other our ours ourselves out over own same she should so some such than that the their
+    theirs them themselves then there these they this those through to too under until up very was
+    we were what when where which while who whom why will with would you your
+    yours yourself yourselves also another many much several every either neither whether though
+    although however therefore thus yet still even ever never always often sometimes already almost
+    perhaps rather quite enough less least within without upon across along among around
+    behind beyond toward towards via per since unless whereas
+    get gets got make makes made take takes took taken give gives gave given go goes went gone come
+    comes came see sees saw seen know knows knew known think thinks thought say says said tell tells
+    told find finds found use uses become becomes became seem seems seemed keep keeps kept let lets
+    put puts run runs ran show shows shown bring brings brought begin begins began hold holds held
+    include includes allow allows provide provides require requires enable enables create creates
+    build builds built help helps need needs want wants like likes mean means move moves lead leads
+    led grow grows grew remain remains offer offers continue continues turn turns leave leaves left
+    feel feels felt stay stays appear appears consider considers suggest suggests expect expects
+    win wins won rise rises rose warn warns
+    new old good great high low large small big long short early late best better worse worst
+    important different possible available recent major main key real whole certain clear likely
+    significant particular specific general common global local national public private social
+    economic political modern current future past potential strong weak free full open close
+    hard easy simple complex human natural digital critical difficult similar various
+    heavy electric larger smaller higher lower faster slower greater bigger
+""".split())
+
+_NOUN_SUFFIXES = (
+    "tion", "sion", "ment", "ness", "ity", "ance", "ence", "ism", "ist", "ship", "hood", "ology", "ogy"
+)
+_NON_NOUN_SUFFIXES = (
+    "ly", "ous", "ful", "ive", "able", "ible", "ial", "ical", "less", "ize", "ify", "ed", "ing"
+)
+
+# Common nouns that end in a non-noun suffix
+_SUFFIX_EXCEPTIONS = frozenset("""
+    family supply reply assembly rally ally monopoly anomaly italy july
+    need seed speed feed greed breed hundred bed shed weed creed
+    thing nothing something anything everything building meeting morning evening
+    training learning funding spring string king ring ceiling painting feeling setting
+    marketing programming engineering planning housing clothing understanding
+    objective initiative executive detective representative alternative incentive archive
+    table cable variable vegetable trial material official tutorial editorial
+""".split())
+
+def _is_probable_noun(token: str) -> bool:
+    """Approximate a noun check without a POS tagger"""
+    if token in _NON_NOUNS:
+        return False
+    if "-" in token:
+        # Hyphenated compounds such as "data-driven" are almost always modifiers
+        return False
+    if token in _SUFFIX_EXCEPTIONS or token.endswith(_NOUN_SUFFIXES):
+        return True
+    return not token.endswith(_NON_NOUN_SUFFIXES)
+
+def extract_keywords_fast(text: str, num_keywords: int = 3) -> list:
+    """
+    Extract the most frequent likely nouns without NLTK.
+    Approximates extract_keywords' noun filter with a regex tokenizer, a
+    lexicon of common non-nouns and suffix heuristics, at a fraction of the cost.
+    """
+    if not text or not text.strip():
+        return []
+    
+    nouns = [
+        token for token in _FAST_TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 2 and _is_probable_noun(token)
+    ]
+    
+    return [word for word, count in Counter(nouns).most_common(num_keywords)]
+
+@profiled("keywords.extract")
+def extract_keywords(text: str, num_keywords: int = 3, engine: str = None) -> list:
     """
     Extract the most frequent nouns from text.
     Returns a list of the top N keywords.
+    The engine defaults to KEYWORD_ENGINE; pass "fast" to skip POS tagging.
+    Raises ValueError for an engine not in KEYWORD_ENGINES.
     """
+    engine = engine or KEYWORD_ENGINE
+    if engine not in KEYWORD_ENGINES:
+        raise ValueError(f"Unknown keyword engine {engine!r}, expected one of {KEYWORD_ENGINES}")
+    
     if not text or not text.strip():
         return []
     
+    if engine == "fast":
+        return extract_keywords_fast(text, num_keywords)
+    
     if not NLTK_AVAILABLE:
         return extract_keywords_fallback(text, num_keywords)
     
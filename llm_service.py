@@ -1,8 +1,12 @@
 import os
 import json
+from typing import Optional
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from admission import Deadline, DeadlineExceeded
+from profiling import profiled
+
 load_dotenv()
 
 class LLMService:
@@ -10,16 +14,28 @@ class LLMService:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(
+            api_key=api_key,
+            timeout=float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "1"))
+        )
     
-    def analyze_text(self, text: str) -> dict:
+    @profiled("llm.analyze_text")
+    def analyze_text(self, text: str, deadline: Optional[Deadline] = None) -> dict:
         """
         Use LLM to analyze text and extract structured data.
         Returns a dictionary with summary, title, topics, and sentiment.
+        When a deadline is given the API call is bounded by its remaining time.
         """
         if not text or not text.strip():
             raise ValueError("Text cannot be empty")
         
+        client = self.client
+        if deadline is not None:
+            deadline.check("LLM analysis")
+            # Retries would each get the full timeout, so the deadline is spent on one attempt
+            client = self.client.with_options(timeout=deadline.remaining(), max_retries=0)
+        
         prompt = f"""
         Analyze the following text and provide a structured response in JSON format:
         
@@ -41,7 +57,7 @@ class LLMService:
         """
         
         try:
-            response = self.client.chat.completions.create(
+            response = client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that analyzes text and extracts structured information. Always respond with valid JSON."},
@@ -71,6 +87,8 @@ class LLMService:
                 }
                 
         except Exception as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"LLM API call exceeded the request deadline: {str(e)}")
             raise Exception(f"LLM API error: {str(e)}")
     
     def _validate_result(self, result: dict) -> dict:
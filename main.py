@@ -1,13 +1,23 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, status, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import Any, List, Optional
 import logging
+import random
+import time
 from datetime import datetime
 
-from models import TextAnalysisRequest, AnalysisResponse, SearchRequest
+from models import TextAnalysisRequest, AnalysisResponse, SimilarAnalysisResponse, SearchRequest
 from llm_service import LLMService
 from keyword_extractor import extract_keywords
 from supabase_service import get_supabase_service
+from vector_index import get_vector_index
+from shared_cache import get_shared_cache
+from text_store import text_hash
+from admission import AdmissionController, AdmissionRejected, Deadline, DeadlineExceeded
+from profiling import (
+    PROFILE_SAMPLE_RATE, start_profile, finish_profile, record_span, capture_slow_request, server_timing
+)
 import os
 
 app = FastAPI(
@@ -40,15 +50,151 @@ except Exception as e:
     logging.error(f"Supabase service initialization failed: {e}")
     supabase_service = None
 
+# Initialize the local similarity index (shared by workers through mmap'd files)
+vector_index = None
+try:
+    vector_index = get_vector_index()
+except Exception as e:
+    logging.error(f"Vector index initialization failed: {e}")
+    vector_index = None
+
+# Initialize the host-wide cache shared by all workers
+shared_cache = None
+try:
+    shared_cache = get_shared_cache()
+except Exception as e:
+    logging.error(f"Shared cache initialization failed: {e}")
+    shared_cache = None
+
+# Cache helpers below are blocking SQLite calls; endpoints run them through
+# run_in_threadpool so a locked database never stalls the event loop
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60"))
+HEALTH_CACHE_TTL_SECONDS = float(os.getenv("HEALTH_CACHE_TTL_SECONDS", "30"))
+# LLM calls allowed per minute across all workers on this host (0 = unlimited)
+LLM_RATE_LIMIT_PER_MINUTE = int(os.getenv("LLM_RATE_LIMIT_PER_MINUTE", "0"))
+
+def cache_get(namespace: str, key: str) -> Optional[Any]:
+    """Read from the shared cache, treating any cache failure as a miss"""
+    if shared_cache is None:
+        return None
+    try:
+        return shared_cache.get(namespace, key)
+    except Exception as e:
+        logging.warning(f"Shared cache read failed: {e}")
+        return None
+
+def cache_set(namespace: str, key: str, value: Any, ttl: float):
+    """Write to the shared cache, ignoring cache failures"""
+    if shared_cache is None:
+        return
+    try:
+        shared_cache.set(namespace, key, value, ttl)
+    except Exception as e:
+        logging.warning(f"Shared cache write failed: {e}")
+
+def reserve_llm_budget():
+    """
+    Count an LLM call against the host-wide per-minute budget.
+    Raises AdmissionRejected once the budget for the current minute is spent.
+    """
+    if shared_cache is None or LLM_RATE_LIMIT_PER_MINUTE <= 0:
+        return
+    now = time.time()
+    try:
+        used = shared_cache.incr("ratelimit", f"llm:{int(now // 60)}", ttl=120)
+    except Exception as e:
+        logging.warning(f"Shared cache rate limit check failed: {e}")
+        return
+    if used > LLM_RATE_LIMIT_PER_MINUTE:
+        raise AdmissionRejected(429, "LLM rate limit reached, try again later", max(1, 60 - int(now % 60)))
+
+def search_cache_key(topic: str) -> str:
+    """Search cache key, scoped to the current generation of stored analyses"""
+    generation = cache_get("counters", "search_generation") or 0
+    return f"{generation}:{topic.lower()}"
+
+def invalidate_search_cache():
+    """Move to a new generation so cached search results for older data are ignored"""
+    if shared_cache is None:
+        return
+    try:
+        shared_cache.incr("counters", "search_generation", ttl=30 * 86400)
+    except Exception as e:
+        logging.warning(f"Shared cache invalidation failed: {e}")
+
+def index_analysis(result: dict):
+    """Append a stored analysis to the similarity index, marking it stale on failure"""
+    try:
+        vector_index.add(result)
+    except Exception as e:
+        logging.warning(f"Failed to index analysis {result['id']}: {e}")
+        try:
+            # Rebuild from Supabase on the next similarity search so the row isn't lost
+            vector_index.mark_stale()
+        except Exception as e:
+            logging.warning(f"Failed to mark vector index stale: {e}")
+
+# Bound the number of /analyze requests each worker runs and queues, so a slow
+# LLM sheds load instead of piling up requests that clients have given up on.
+ANALYZE_DEADLINE_SECONDS = float(os.getenv("ANALYZE_DEADLINE_SECONDS", "30"))
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("ANALYZE_MAX_CONCURRENT", "8")),
+    max_queue=int(os.getenv("ANALYZE_MAX_QUEUE", "16"))
+)
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """
+    Time service calls for requests sent with X-Profile: 1, or for a
+    PROFILE_SAMPLE_RATE fraction of all requests. Slow profiled requests are
+    written to the slow request log; X-Profile requests also get their span
+    totals back in the Server-Timing header.
+    """
+    requested = request.headers.get("x-profile", "").lower() in ("1", "true", "yes")
+    if not requested and (PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE):
+        return await call_next(request)
+    
+    token = start_profile()
+    status_code = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        profile = finish_profile(token)
+        try:
+            capture_slow_request(
+                profile,
+                request.method,
+                request.url.path,
+                status_code,
+                int(request.headers.get("content-length") or 0)
+            )
+        except Exception as e:
+            logging.warning(f"Failed to capture slow request: {e}")
+    
+    if requested:
+        response.headers["Server-Timing"] = server_timing(profile, response.headers.get("Server-Timing"))
+    return response
+
 @app.get("/")
 async def root():
     return {"message": "Jouster LLM Knowledge Extractor API", "status": "running"}
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    llm_status = "available" if llm_service and llm_service.is_available() else "unavailable"
-    supabase_status = "available" if supabase_service and supabase_service.is_available() else "unavailable"
+    """Health check endpoint. Probe results are shared by all workers for a short time."""
+    health = await run_in_threadpool(cache_get, "health", "services")
+    if health is None:
+        health = {
+            "llm": bool(llm_service and llm_service.is_available()),
+            "supabase": bool(supabase_service and supabase_service.is_available())
+        }
+        await run_in_threadpool(cache_set, "health", "services", health, HEALTH_CACHE_TTL_SECONDS)
+    
+    llm_status = "available" if health["llm"] else "unavailable"
+    supabase_status = "available" if health["supabase"] else "unavailable"
     
     return {
         "status": "healthy" if supabase_status == "available" else "unhealthy",
@@ -56,10 +202,23 @@ async def health_check():
         "supabase": supabase_status
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Admission queue metrics for this worker and shared cache entry counts for the host"""
+    return {
+        "analyze_admission": admission.stats(),
+        "shared_cache": await run_in_threadpool(shared_cache.stats) if shared_cache is not None else None
+    }
+
 @app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_text(request: TextAnalysisRequest):
+async def analyze_text(
+    request: TextAnalysisRequest,
+    response: Response,
+    x_request_timeout: Optional[float] = Header(None)
+):
     """
     Analyze text and extract structured data using Supabase.
+    Clients may shorten the deadline with an X-Request-Timeout header (seconds).
     """
     if not request.text or not request.text.strip():
         raise HTTPException(
@@ -79,30 +238,50 @@ async def analyze_text(request: TextAnalysisRequest):
             detail="LLM service is not available. Please check your API key configuration."
         )
     
+    timeout = ANALYZE_DEADLINE_SECONDS
+    if x_request_timeout is not None and x_request_timeout > 0:
+        timeout = min(timeout, x_request_timeout)
+    deadline = Deadline(timeout)
+    
     try:
-        llm_result = llm_service.analyze_text(request.text)
+        async with admission.admit(deadline) as queue_wait:
+            response.headers["Server-Timing"] = f"queue;dur={queue_wait * 1000:.1f}"
+            record_span("queue", queue_wait)
+            
+            # Identical texts reuse the LLM result computed by any worker
+            llm_cache_key = text_hash(request.text)
+            llm_result = await run_in_threadpool(cache_get, "llm", llm_cache_key)
+            if llm_result is None:
+                await run_in_threadpool(reserve_llm_budget)
+                llm_result = await run_in_threadpool(llm_service.analyze_text, request.text, deadline)
+                await run_in_threadpool(cache_set, "llm", llm_cache_key, llm_result, LLM_CACHE_TTL_SECONDS)
+            
+            # Extract keywords using our custom implementation
+            keywords = await run_in_threadpool(extract_keywords, request.text, 3)
+            
+            # Validate and prepare data for Supabase
+            analysis_data = {
+                "original_text": request.text,
+                "summary": llm_result.get("summary") or "No summary available",
+                "title": llm_result.get("title"),
+                "topics": llm_result.get("topics") or ["general", "text", "analysis"],
+                "sentiment": llm_result.get("sentiment") or "neutral",
+                "keywords": keywords or ["text", "analysis", "content"]
+            }
+            
+            # Ensure sentiment is valid and not None
+            valid_sentiments = ["positive", "neutral", "negative"]
+            sentiment = analysis_data["sentiment"]
+            if sentiment is None or not isinstance(sentiment, str) or sentiment not in valid_sentiments:
+                analysis_data["sentiment"] = "neutral"
+            
+            # Store in Supabase
+            result = await run_in_threadpool(supabase_service.create_analysis, analysis_data, deadline)
         
-        # Extract keywords using our custom implementation
-        keywords = extract_keywords(request.text, num_keywords=3)
+        await run_in_threadpool(invalidate_search_cache)
         
-        # Validate and prepare data for Supabase
-        analysis_data = {
-            "original_text": request.text,
-            "summary": llm_result.get("summary") or "No summary available",
-            "title": llm_result.get("title"),
-            "topics": llm_result.get("topics") or ["general", "text", "analysis"],
-            "sentiment": llm_result.get("sentiment") or "neutral",
-            "keywords": keywords or ["text", "analysis", "content"]
-        }
-        
-        # Ensure sentiment is valid and not None
-        valid_sentiments = ["positive", "neutral", "negative"]
-        sentiment = analysis_data["sentiment"]
-        if sentiment is None or not isinstance(sentiment, str) or sentiment not in valid_sentiments:
-            analysis_data["sentiment"] = "neutral"
-        
-        # Store in Supabase
-        result = supabase_service.create_analysis(analysis_data)
+        if vector_index is not None:
+            await run_in_threadpool(index_analysis, result)
         
         return AnalysisResponse(
             id=result["id"],
@@ -114,6 +293,18 @@ async def analyze_text(request: TextAnalysisRequest):
             created_at=datetime.fromisoformat(result["created_at"].replace('Z', '+00:00'))
         )
         
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -144,7 +335,11 @@ async def search_analyses(topic: str):
         )
     
     try:
-        results = supabase_service.search_analyses(topic)
+        cache_key = await run_in_threadpool(search_cache_key, topic)
+        results = await run_in_threadpool(cache_get, "search", cache_key)
+        if results is None:
+            results = await run_in_threadpool(supabase_service.search_analyses, topic)
+            await run_in_threadpool(cache_set, "search", cache_key, results, SEARCH_CACHE_TTL_SECONDS)
         
         return [
             AnalysisResponse(
@@ -164,6 +359,58 @@ async def search_analyses(topic: str):
             detail=f"Search failed: {str(e)}"
         )
 
+@app.get("/search/similar", response_model=List[SimilarAnalysisResponse])
+async def search_similar(q: str, k: int = 10):
+    """
+    Find analyses similar to a free-text query using the local TF-IDF index.
+    """
+    if not q or not q.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query parameter cannot be empty"
+        )
+    
+    if k < 1 or k > 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="k must be between 1 and 100"
+        )
+    
+    if not supabase_service or vector_index is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Similarity search is not available"
+        )
+    
+    try:
+        if not vector_index.is_built():
+            analyses = await run_in_threadpool(supabase_service.get_all_analyses)
+            await run_in_threadpool(vector_index.rebuild, analyses, only_if_unbuilt=True)
+        
+        matches = await run_in_threadpool(vector_index.search, q, k)
+        scores = dict(matches)
+        results = await run_in_threadpool(supabase_service.get_analyses_by_ids, list(scores))
+        results.sort(key=lambda result: scores[result["id"]], reverse=True)
+        
+        return [
+            SimilarAnalysisResponse(
+                id=result["id"],
+                summary=result["summary"],
+                title=result["title"],
+                topics=result["topics"],
+                sentiment=result["sentiment"],
+                keywords=result["keywords"],
+                created_at=datetime.fromisoformat(result["created_at"].replace('Z', '+00:00')),
+                score=scores[result["id"]]
+            )
+            for result in results
+        ]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Similarity search failed: {str(e)}"
+        )
+
 @app.get("/analyses", response_model=List[AnalysisResponse])
 async def get_all_analyses():
     """
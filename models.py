@@ -17,5 +17,8 @@ class AnalysisResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SimilarAnalysisResponse(AnalysisResponse):
+    score: float
+
 class SearchRequest(BaseModel):
     topic: str
@@ -0,0 +1,273 @@
+import contextvars
+import fcntl
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+# Fraction of requests profiled without an X-Profile header
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Profiled requests slower than this are written to the slow request log
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "5000"))
+SLOW_REQUEST_LOG = os.getenv(
+    "SLOW_REQUEST_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "slow_requests.log")
+)
+# Attach a sampled stack profile to captured requests
+PROFILE_CPU_SAMPLING = os.getenv("PROFILE_CPU_SAMPLING", "false").lower() in ("1", "true", "yes")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "10"))
+
+_MAX_STACK_DEPTH = 40
+_TOP_STACKS = 20
+
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+
+class RequestProfile:
+    """Timing spans, and optionally stack samples, collected for one request"""
+
+    def __init__(self, cpu_sampling: bool = False):
+        self.started_at = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.cpu_sampling = cpu_sampling
+        self.stack_samples: Counter = Counter()
+        # Threads currently executing inside one of this request's spans
+        self._active_threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def add_span(self, name: str, start_ms: float, duration_ms: float):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "start_ms": round(start_ms, 2),
+                "duration_ms": round(duration_ms, 2)
+            })
+
+    def _enter_thread(self):
+        tid = threading.get_ident()
+        with self._lock:
+            self._active_threads[tid] = self._active_threads.get(tid, 0) + 1
+
+    def _exit_thread(self):
+        tid = threading.get_ident()
+        with self._lock:
+            depth = self._active_threads.get(tid, 0) - 1
+            if depth > 0:
+                self._active_threads[tid] = depth
+            else:
+                self._active_threads.pop(tid, None)
+
+    def add_stack_sample(self, stack: str):
+        with self._lock:
+            self.stack_samples[stack] += 1
+
+    def active_threads(self) -> List[int]:
+        with self._lock:
+            return list(self._active_threads)
+
+    def span_totals(self) -> Dict[str, float]:
+        """Total milliseconds per span name"""
+        totals: Dict[str, float] = {}
+        for span_record in self.spans:
+            totals[span_record["name"]] = round(totals.get(span_record["name"], 0.0) + span_record["duration_ms"], 2)
+        return totals
+
+    def top_stacks(self, limit: int = _TOP_STACKS) -> List[Dict]:
+        with self._lock:
+            most_common = self.stack_samples.most_common(limit)
+        return [{"stack": stack, "samples": count} for stack, count in most_common]
+
+@contextmanager
+def span(name: str):
+    """Time a block as a named span of the current request, if it is being profiled"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    profile._enter_thread()
+    try:
+        yield
+    finally:
+        profile._exit_thread()
+        end = time.perf_counter()
+        profile.add_span(name, (start - profile.started_at) * 1000, (end - start) * 1000)
+
+def profiled(name: str):
+    """Decorator that records every call of a function as a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_profile.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_span(name: str, duration_seconds: float):
+    """Record a span measured elsewhere, ending now"""
+    profile = _current_profile.get()
+    if profile is not None:
+        duration_ms = duration_seconds * 1000
+        profile.add_span(name, profile.elapsed_ms() - duration_ms, duration_ms)
+
+class _StackSampler:
+    """
+    Single background thread that samples the stacks of threads currently
+    inside a profiled span. It only runs while at least one sampling
+    profile is active, so it costs nothing when profiling is off.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._profiles = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                profiles = list(self._profiles)
+            frames = sys._current_frames()
+            for profile in profiles:
+                for tid in profile.active_threads():
+                    frame = frames.get(tid)
+                    if frame is not None:
+                        profile.add_stack_sample(_collapse_stack(frame))
+            time.sleep(self.interval)
+
+def _collapse_stack(frame) -> str:
+    """Render a frame chain as "file:function;..." from outermost to innermost"""
+    names = []
+    while frame is not None and len(names) < _MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+_sampler = _StackSampler(PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+def start_profile(cpu_sampling: bool = PROFILE_CPU_SAMPLING):
+    """Begin profiling the current request. Returns a token for finish_profile."""
+    profile = RequestProfile(cpu_sampling=cpu_sampling)
+    if cpu_sampling:
+        _sampler.add(profile)
+    return profile, _current_profile.set(profile)
+
+def finish_profile(token) -> RequestProfile:
+    """Stop profiling the current request and return what was collected"""
+    profile, context_token = token
+    if profile.cpu_sampling:
+        _sampler.remove(profile)
+    _current_profile.reset(context_token)
+    return profile
+
+slow_request_logger = None
+
+def server_timing(profile: RequestProfile, existing: Optional[str] = None) -> str:
+    """
+    Server-Timing header value with the profile's span totals and total time.
+    Metrics already present in existing, set by the endpoint, are kept and
+    not reported twice.
+    """
+    reported = {metric.split(";")[0].strip() for metric in existing.split(",")} if existing else set()
+    timings = [
+        f"{name};dur={duration}" for name, duration in profile.span_totals().items()
+        if name not in reported
+    ]
+    timings.append(f"total;dur={profile.elapsed_ms():.1f}")
+    return ", ".join(([existing] if existing else []) + timings)
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that several worker processes can share.
+    Each write holds an exclusive file lock, and reopens the log first if
+    another process has rotated it, so records always land in the current
+    file and the size and backup bounds hold for all workers together.
+    """
+
+    def __init__(self, filename: str, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+        self._lock_path = self.baseFilename + ".lock"
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self.stream.fileno())
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.stream.close()
+            self.stream = None
+
+    def emit(self, record: logging.LogRecord):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reopen_if_rotated()
+                super().emit(record)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def get_slow_request_logger() -> logging.Logger:
+    """Logger writing one JSON line per slow request to a rotating file"""
+    global slow_request_logger
+    if slow_request_logger is None:
+        os.makedirs(os.path.dirname(SLOW_REQUEST_LOG) or ".", exist_ok=True)
+        handler = SharedRotatingFileHandler(SLOW_REQUEST_LOG, maxBytes=5 * 1024 * 1024, backupCount=3)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        slow_request_logger = logging.getLogger("jouster.slow_requests")
+        slow_request_logger.setLevel(logging.INFO)
+        slow_request_logger.addHandler(handler)
+        slow_request_logger.propagate = False
+    return slow_request_logger
+
+def capture_slow_request(profile: RequestProfile, method: str, path: str, status_code: int, input_bytes: int,
+                         threshold_ms: float = SLOW_REQUEST_THRESHOLD_MS) -> bool:
+    """Write the profile to the slow request log if the request exceeded the threshold"""
+    duration_ms = profile.elapsed_ms()
+    if duration_ms < threshold_ms:
+        return False
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "duration_ms": round(duration_ms, 2),
+        "input_bytes": input_bytes,
+        "span_totals": profile.span_totals(),
+        "spans": profile.spans
+    }
+    if profile.cpu_sampling:
+        record["cpu_profile"] = {
+            "interval_ms": PROFILE_SAMPLE_INTERVAL_MS,
+            "stacks": profile.top_stacks()
+        }
+    get_slow_request_logger().info(json.dumps(record))
+    return True
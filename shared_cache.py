@@ -0,0 +1,143 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_PATH = os.getenv(
+    "SHARED_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "shared_cache.db")
+)
+DEFAULT_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "50000"))
+# How long a call waits for another process's write lock before raising
+# sqlite3.OperationalError. Kept short: callers treat a locked cache as a miss.
+BUSY_TIMEOUT_SECONDS = float(os.getenv("SHARED_CACHE_BUSY_TIMEOUT_SECONDS", "0.25"))
+
+# Eviction runs on roughly one write in this many
+_EVICTION_INTERVAL = 200
+
+# Namespaces holding counters. Capacity eviction never removes them, since
+# dropping a live counter would silently reset a rate limit or generation;
+# they are only removed once they expire.
+PINNED_NAMESPACES = ("ratelimit", "counters")
+
+class SharedCache:
+    """
+    Key-value store shared by all workers on a host.
+    Backed by a SQLite database in WAL mode, so readers never block the
+    writer and every operation is atomic across processes. Values are
+    stored as JSON with a TTL. When the store grows past max_entries the
+    entries closest to expiry are evicted first, except in pinned namespaces.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 pinned_namespaces: tuple = PINNED_NAMESPACES,
+                 busy_timeout: float = BUSY_TIMEOUT_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.busy_timeout = busy_timeout
+        self.pinned_namespaces = tuple(pinned_namespaces)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connection()
+        # Workers create the schema concurrently at startup, so allow a longer wait here
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_expires_at ON entries(expires_at)")
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread, reopened after a fork"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        row = self._connection().execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        """Store a JSON-serialisable value for ttl seconds"""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), time.time() + ttl)
+        )
+        if random.randrange(_EVICTION_INTERVAL) == 0:
+            self.evict()
+
+    def delete(self, namespace: str, key: str):
+        """Remove a single entry"""
+        self._connection().execute(
+            "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def incr(self, namespace: str, key: str, ttl: float, amount: int = 1) -> int:
+        """
+        Atomically add to a counter and return the new value.
+        A missing or expired counter restarts from zero with a fresh TTL,
+        which makes fixed-window rate limits a single call.
+        """
+        now = time.time()
+        row = self._connection().execute("""
+            INSERT INTO entries (namespace, key, value, expires_at)
+            VALUES (:namespace, :key, :amount, :expires_at)
+            ON CONFLICT (namespace, key) DO UPDATE SET
+                value = CASE WHEN expires_at > :now THEN CAST(CAST(value AS INTEGER) + :amount AS TEXT)
+                             ELSE excluded.value END,
+                expires_at = CASE WHEN expires_at > :now THEN expires_at ELSE excluded.expires_at END
+            RETURNING value
+        """, {"namespace": namespace, "key": key, "amount": amount, "expires_at": now + ttl, "now": now}).fetchone()
+        return int(row[0])
+
+    def evict(self):
+        """
+        Drop expired entries, then the entries closest to expiry beyond
+        max_entries. Entries in pinned namespaces don't count towards the
+        limit and are never evicted early.
+        """
+        conn = self._connection()
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        placeholders = ", ".join("?" for _ in self.pinned_namespaces) or "NULL"
+        conn.execute(f"""
+            DELETE FROM entries WHERE (namespace, key) IN (
+                SELECT namespace, key FROM entries
+                WHERE namespace NOT IN ({placeholders})
+                ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+            )
+        """, self.pinned_namespaces + (self.max_entries,))
+
+    def stats(self) -> Dict:
+        """Entry counts per namespace"""
+        rows = self._connection().execute(
+            "SELECT namespace, COUNT(*) FROM entries WHERE expires_at > ? GROUP BY namespace",
+            (time.time(),)
+        ).fetchall()
+        return {namespace: count for namespace, count in rows}
+
+shared_cache = None
+
+def get_shared_cache() -> SharedCache:
+    """Get or create the shared cache for this process"""
+    global shared_cache
+    if shared_cache is None:
+        shared_cache = SharedCache()
+    return shared_cache
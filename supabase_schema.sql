@@ -1,7 +1,18 @@
 
+-- Raw input texts, stored once per distinct content and keyed by SHA-256.
+-- content is plain TEXT so TOAST compresses large values at rest and
+-- search can match it server-side.
+CREATE TABLE IF NOT EXISTS text_blobs (
+    hash CHAR(64) PRIMARY KEY,
+    content TEXT NOT NULL,
+    original_size INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 CREATE TABLE IF NOT EXISTS analyses (
     id SERIAL PRIMARY KEY,
-    original_text TEXT NOT NULL,
+    original_text TEXT,
+    text_hash CHAR(64) REFERENCES text_blobs(hash),
     summary TEXT NOT NULL,
     title VARCHAR(255),
     topics JSONB NOT NULL,
@@ -15,3 +26,41 @@ CREATE INDEX IF NOT EXISTS idx_analyses_sentiment ON analyses(sentiment);
 CREATE INDEX IF NOT EXISTS idx_analyses_topics ON analyses USING GIN(topics);
 CREATE INDEX IF NOT EXISTS idx_analyses_keywords ON analyses USING GIN(keywords);
 
+-- Migration for databases created before text_blobs existed.
+-- Existing rows keep original_text inline and are read through the legacy path.
+ALTER TABLE analyses ADD COLUMN IF NOT EXISTS text_hash CHAR(64) REFERENCES text_blobs(hash);
+ALTER TABLE analyses ALTER COLUMN original_text DROP NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_analyses_text_hash ON analyses(text_hash);
+
+-- Substring search used by /search. It matches topics, keywords, the summary
+-- and the original text inside the database, so a search is one round trip
+-- and no text leaves the server. Results come back in id order.
+CREATE OR REPLACE FUNCTION search_analyses(search_topic TEXT)
+RETURNS TABLE (
+    id INTEGER,
+    summary TEXT,
+    title VARCHAR(255),
+    topics JSONB,
+    sentiment VARCHAR(20),
+    keywords JSONB,
+    text_hash CHAR(64),
+    created_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT a.id, a.summary, a.title, a.topics, a.sentiment, a.keywords, a.text_hash, a.created_at
+    FROM analyses a
+    LEFT JOIN text_blobs b ON b.hash = a.text_hash
+    WHERE EXISTS (
+            SELECT 1 FROM jsonb_array_elements_text(a.topics) t
+            WHERE strpos(lower(t), lower(search_topic)) > 0
+        )
+        OR EXISTS (
+            SELECT 1 FROM jsonb_array_elements_text(a.keywords) k
+            WHERE strpos(lower(k), lower(search_topic)) > 0
+        )
+        OR strpos(lower(a.summary), lower(search_topic)) > 0
+        OR strpos(lower(COALESCE(b.content, a.original_text, '')), lower(search_topic)) > 0
+    ORDER BY a.id;
+$$;
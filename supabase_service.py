@@ -1,11 +1,28 @@
 import os
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from typing import List, Dict, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 
+from text_store import make_blob
+from admission import Deadline, DeadlineExceeded
+from profiling import profiled
+
 load_dotenv()
 
+# Columns returned by list/search queries. The raw input lives in the
+# text_blobs table and is only fetched when a caller actually needs it.
+ANALYSIS_COLUMNS = "id, summary, title, topics, sentiment, keywords, text_hash, created_at"
+
+# in_ filters travel in the request URL; a batch of 64-char hashes this size
+# stays around 7 KB, well under common proxy URL limits.
+IN_FILTER_BATCH_SIZE = 100
+
+def _batches(values: List, size: int = IN_FILTER_BATCH_SIZE):
+    """Split a list into consecutive chunks of at most `size` items"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
 class SupabaseService:
     def __init__(self):
         """Initialize Supabase client"""
@@ -19,75 +36,122 @@ class SupabaseService:
         self.url = self.url.strip("'\"")
         self.key = self.key.strip("'\"")
         
-        self.supabase: Client = create_client(self.url, self.key)
+        # Upper bound for any single PostgREST call. supabase-py has no per-call
+        # timeout, so a call started within a request's deadline can still
+        # overrun it by up to this much.
+        options = ClientOptions(postgrest_client_timeout=float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10")))
+        # Time a request must have left before a write is started
+        self.min_call_budget = float(os.getenv("SUPABASE_MIN_CALL_BUDGET_SECONDS", "1"))
+        self.supabase: Client = create_client(self.url, self.key, options=options)
     
-    def create_analysis(self, analysis_data: Dict) -> Dict:
-        """Create a new analysis record"""
+    @profiled("supabase.create_analysis")
+    def create_analysis(self, analysis_data: Dict, deadline: Optional[Deadline] = None) -> Dict:
+        """
+        Create a new analysis record.
+        The original text is stored once in text_blobs, keyed by its hash,
+        and the analysis row only keeps the reference.
+        With a deadline, each write is only started if at least
+        min_call_budget seconds remain; otherwise DeadlineExceeded is raised.
+        """
         try:
-            result = self.supabase.table("analyses").insert(analysis_data).execute()
+            row = dict(analysis_data)
+            original_text = row.pop("original_text", None)
+            if original_text is not None:
+                blob = make_blob(original_text)
+                if deadline is not None:
+                    deadline.check("storing the original text", self.min_call_budget)
+                self.supabase.table("text_blobs").upsert(
+                    blob, on_conflict="hash", ignore_duplicates=True
+                ).execute()
+                row["text_hash"] = blob["hash"]
+            
+            if deadline is not None:
+                deadline.check("storing the analysis", self.min_call_budget)
+            result = self.supabase.table("analyses").insert(row).execute()
             return result.data[0] if result.data else None
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             raise Exception(f"Failed to create analysis: {str(e)}")
     
-    def get_analysis(self, analysis_id: int) -> Optional[Dict]:
-        """Get a single analysis by ID"""
+    @profiled("supabase.get_analysis")
+    def get_analysis(self, analysis_id: int, include_text: bool = False) -> Optional[Dict]:
+        """Get a single analysis by ID, optionally with its original text"""
         try:
-            result = self.supabase.table("analyses").select("*").eq("id", analysis_id).execute()
-            return result.data[0] if result.data else None
+            result = self.supabase.table("analyses").select(ANALYSIS_COLUMNS).eq("id", analysis_id).execute()
+            if not result.data:
+                return None
+            analysis = result.data[0]
+            if include_text:
+                analysis["original_text"] = self.get_original_texts([analysis]).get(analysis["id"])
+            return analysis
         except Exception as e:
             raise Exception(f"Failed to get analysis: {str(e)}")
     
+    @profiled("supabase.get_all_analyses")
     def get_all_analyses(self) -> List[Dict]:
         """Get all analyses ordered by creation date"""
         try:
-            result = self.supabase.table("analyses").select("*").order("created_at", desc=True).execute()
+            result = self.supabase.table("analyses").select(ANALYSIS_COLUMNS).order("created_at", desc=True).execute()
+            return result.data or []
+        except Exception as e:
+            raise Exception(f"Failed to get analyses: {str(e)}")
+    
+    @profiled("supabase.get_analyses_by_ids")
+    def get_analyses_by_ids(self, analysis_ids: List[int]) -> List[Dict]:
+        """Get several analyses by ID, in no particular order"""
+        if not analysis_ids:
+            return []
+        try:
+            result = self.supabase.table("analyses").select(ANALYSIS_COLUMNS).in_("id", analysis_ids).execute()
             return result.data or []
         except Exception as e:
             raise Exception(f"Failed to get analyses: {str(e)}")
     
+    @profiled("supabase.get_original_texts")
+    def get_original_texts(self, analyses: List[Dict]) -> Dict[int, str]:
+        """
+        Lazily load the original text for the given analyses.
+        Returns a mapping of analysis id to text. Blobs shared by several
+        analyses are fetched only once.
+        """
+        texts = {}
+        hashes = sorted({a["text_hash"] for a in analyses if a.get("text_hash")})
+        if hashes:
+            blobs = {}
+            for batch in _batches(hashes):
+                result = self.supabase.table("text_blobs").select("hash, content").in_("hash", batch).execute()
+                for blob in result.data or []:
+                    blobs[blob["hash"]] = blob["content"]
+            for analysis in analyses:
+                if analysis.get("text_hash") in blobs:
+                    texts[analysis["id"]] = blobs[analysis["text_hash"]]
+        
+        # Rows written before text_blobs existed still carry the text inline
+        legacy_ids = [a["id"] for a in analyses if not a.get("text_hash")]
+        for batch in _batches(legacy_ids):
+            result = self.supabase.table("analyses").select("id, original_text").in_("id", batch).execute()
+            for row in result.data or []:
+                if row.get("original_text") is not None:
+                    texts[row["id"]] = row["original_text"]
+        
+        return texts
+    
+    @profiled("supabase.search_analyses")
     def search_analyses(self, topic: str) -> List[Dict]:
-        """Search analyses by topic or keyword"""
+        """
+        Search analyses by topic or keyword.
+        Matches topics, keywords, summary and the original text with the
+        search_analyses database function (see supabase_schema.sql), so the
+        texts are never shipped to the client.
+        """
         try:
-            # Get all analyses and filter in Python for more reliable results
-            all_analyses = self.supabase.table("analyses").select("*").execute()
-            
-            if not all_analyses.data:
-                return []
-            
-            # Filter results that contain the topic in any relevant field
-            matching_analyses = []
-            topic_lower = topic.lower()
-            
-            for analysis in all_analyses.data:
-                # Check in topics (JSON array)
-                topics = analysis.get("topics", [])
-                if any(topic_lower in str(t).lower() for t in topics):
-                    matching_analyses.append(analysis)
-                    continue
-                
-                # Check in keywords (JSON array)
-                keywords = analysis.get("keywords", [])
-                if any(topic_lower in str(k).lower() for k in keywords):
-                    matching_analyses.append(analysis)
-                    continue
-                
-                # Check in summary
-                summary = analysis.get("summary", "")
-                if topic_lower in summary.lower():
-                    matching_analyses.append(analysis)
-                    continue
-                
-                # Check in original text
-                original_text = analysis.get("original_text", "")
-                if topic_lower in original_text.lower():
-                    matching_analyses.append(analysis)
-                    continue
-            
-            return matching_analyses
-            
+            result = self.supabase.rpc("search_analyses", {"search_topic": topic}).execute()
+            return result.data or []
         except Exception as e:
             raise Exception(f"Failed to search analyses: {str(e)}")
     
+    @profiled("supabase.delete_analysis")
     def delete_analysis(self, analysis_id: int) -> bool:
         """Delete an analysis by ID"""
         try:
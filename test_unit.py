@@ -3,6 +3,14 @@
 Unit tests for the Jouster LLM Knowledge Extractor
 """
 import unittest
+import asyncio
+import json
+import logging
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
 from unittest.mock import patch, MagicMock
 import sys
 import os
@@ -10,8 +18,17 @@ import os
 # Add the project root to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from keyword_extractor import extract_keywords
+from keyword_extractor import extract_keywords, extract_keywords_fast, _configured_engine
 from llm_service import LLMService
+from text_store import make_blob, text_hash
+from supabase_service import SupabaseService
+from vector_index import VectorIndex
+from shared_cache import SharedCache
+from profiling import (
+    profiled, record_span, start_profile, finish_profile, capture_slow_request, server_timing,
+    SharedRotatingFileHandler
+)
+from admission import AdmissionController, AdmissionRejected, Deadline, DeadlineExceeded
 
 class TestKeywordExtractor(unittest.TestCase):
     """Test the keyword extraction functionality"""
@@ -46,6 +63,30 @@ class TestKeywordExtractor(unittest.TestCase):
         text = "Machine learning and artificial intelligence are transforming data science and analytics."
         keywords = extract_keywords(text, num_keywords=5)
         self.assertLessEqual(len(keywords), 5)
+    
+    def test_extract_keywords_fast_skips_non_nouns(self):
+        """Test that the fast engine drops verbs, adjectives and adverbs"""
+        text = "Researchers quickly published exciting results. The researchers shared results with students."
+        keywords = extract_keywords_fast(text, num_keywords=3)
+        
+        self.assertEqual(keywords[:2], ['researchers', 'results'])
+        for word in ['quickly', 'published', 'exciting', 'shared']:
+            self.assertNotIn(word, keywords)
+    
+    def test_extract_keywords_engine_selection(self):
+        """Test that engine="fast" routes to the fast extractor"""
+        text = "Climate scientists study ocean temperatures and coral reefs."
+        self.assertEqual(extract_keywords(text, 3, engine="fast"), extract_keywords_fast(text, 3))
+    
+    def test_unknown_engine_is_rejected(self):
+        """Test that a misspelled engine warns or raises instead of silently using nltk"""
+        self.assertEqual(_configured_engine(" Fast "), "fast")
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(_configured_engine("fats"), "nltk")
+        self.assertIn("fats", mock_print.call_args[0][0])
+        with self.assertRaises(ValueError):
+            extract_keywords("Some text about engines", 3, engine="fats")
+        self.assertEqual(extract_keywords_fast("", 3), [])
 
 class TestLLMService(unittest.TestCase):
     """Test the LLM service functionality"""
@@ -56,7 +97,7 @@ class TestLLMService(unittest.TestCase):
         with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
             service = LLMService()
             self.assertIsNotNone(service.client)
-            mock_openai.assert_called_once_with(api_key='test-key')
+            mock_openai.assert_called_once_with(api_key='test-key', timeout=30.0, max_retries=1)
     
     def test_llm_service_initialization_no_key(self):
         """Test LLM service initialization without API key"""
@@ -101,5 +142,328 @@ class TestLLMService(unittest.TestCase):
             
             self.assertFalse(result)
 
+class TestAdmissionController(unittest.TestCase):
+    """Test admission control and load shedding"""
+    
+    def test_admits_and_records_queue_wait(self):
+        """Test that an idle controller admits immediately"""
+        controller = AdmissionController(max_concurrent=1, max_queue=1)
+        
+        async def run():
+            async with controller.admit(Deadline(5)) as queue_wait:
+                return queue_wait
+        
+        self.assertLess(asyncio.run(run()), 0.1)
+        self.assertEqual(controller.stats()["admitted"], 1)
+    
+    def test_sheds_when_queue_full(self):
+        """Test that with no queue the first request runs and the second gets a 429"""
+        controller = AdmissionController(max_concurrent=1, max_queue=0)
+        
+        async def run():
+            async with controller.admit(Deadline(5)):
+                self.assertEqual(controller.stats()["in_flight"], 1)
+                async with controller.admit(Deadline(5)):
+                    pass
+        
+        with self.assertRaises(AdmissionRejected) as context:
+            asyncio.run(run())
+        self.assertEqual(context.exception.status_code, 429)
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+        self.assertEqual(controller.stats()["admitted"], 1)
+        self.assertEqual(controller.stats()["shed_queue_full"], 1)
+    
+    def test_idle_controller_admits_despite_slow_history(self):
+        """Test that a service time average above the deadline doesn't shed requests on an idle worker"""
+        controller = AdmissionController(max_concurrent=1, max_queue=4)
+        controller._avg_service_time = 31.0
+        
+        async def run():
+            async with controller.admit(Deadline(30)):
+                pass
+        
+        asyncio.run(run())
+        self.assertEqual(controller.stats()["admitted"], 1)
+        self.assertEqual(controller.stats()["shed_deadline"], 0)
+        self.assertLess(controller.stats()["avg_service_time_ms"], 31000)
+    
+    def test_sheds_when_deadline_expires_in_queue(self):
+        """Test that a queued request is shed with 503 once its deadline passes"""
+        controller = AdmissionController(max_concurrent=1, max_queue=4)
+        
+        async def run():
+            async with controller.admit(Deadline(5)):
+                async with controller.admit(Deadline(0.05)):
+                    pass
+        
+        with self.assertRaises(AdmissionRejected) as context:
+            asyncio.run(run())
+        self.assertEqual(context.exception.status_code, 503)
+        self.assertEqual(controller.stats()["shed_deadline"], 1)
+    
+    @patch('llm_service.OpenAI')
+    def test_llm_call_rejected_after_deadline(self, mock_openai):
+        """Test that the LLM is not called once the deadline has passed"""
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+            service = LLMService()
+            
+            with self.assertRaises(DeadlineExceeded):
+                service.analyze_text("Some text", deadline=Deadline(0))
+            mock_openai.return_value.with_options.assert_not_called()
+
+class TestTextStore(unittest.TestCase):
+    """Test the content-addressed text storage"""
+    
+    def test_blob_holds_text_and_hash(self):
+        """Test that a blob keeps the plain text under its content address"""
+        text = "Machine learning is transforming software. ü"
+        blob = make_blob(text)
+        
+        self.assertEqual(blob["hash"], text_hash(text))
+        self.assertEqual(blob["content"], text)
+        self.assertEqual(blob["original_size"], len(text.encode("utf-8")))
+    
+    def test_identical_texts_share_hash(self):
+        """Test that identical texts map to the same blob"""
+        self.assertEqual(make_blob("same text")["hash"], make_blob("same text")["hash"])
+        self.assertNotEqual(text_hash("one text"), text_hash("another text"))
+
+class TestSupabaseService(unittest.TestCase):
+    """Test the Supabase service with a mocked client"""
+    
+    @patch('supabase_service.create_client')
+    def setUp(self, mock_create_client):
+        with patch.dict(os.environ, {'SUPABASE_URL': 'http://test', 'SUPABASE_KEY': 'test-key'}):
+            self.client = MagicMock()
+            mock_create_client.return_value = self.client
+            self.service = SupabaseService()
+    
+    def test_create_analysis_stores_text_as_blob(self):
+        """Test that original_text goes to text_blobs and only the hash to analyses"""
+        self.service.create_analysis({"original_text": "Some input", "summary": "A summary"})
+        
+        blob = self.client.table.return_value.upsert.call_args[0][0]
+        row = self.client.table.return_value.insert.call_args[0][0]
+        self.assertEqual(blob["content"], "Some input")
+        self.assertNotIn("original_text", row)
+        self.assertEqual(row["text_hash"], blob["hash"])
+    
+    def test_create_analysis_sheds_without_call_budget(self):
+        """Test that no write starts when less than the minimum call budget remains"""
+        self.service.min_call_budget = 1.0
+        
+        with self.assertRaises(DeadlineExceeded):
+            self.service.create_analysis({"original_text": "Some input", "summary": "A summary"}, deadline=Deadline(0.5))
+        self.client.table.return_value.upsert.assert_not_called()
+        self.client.table.return_value.insert.assert_not_called()
+    
+    def test_search_runs_in_database(self):
+        """Test that search is a single RPC call and keeps its result order"""
+        rows = [{"id": 2, "summary": "Robotics news"}, {"id": 7, "summary": "Other"}]
+        self.client.rpc.return_value.execute.return_value = MagicMock(data=rows)
+        
+        results = self.service.search_analyses("robotics")
+        
+        self.assertEqual([r["id"] for r in results], [2, 7])
+        self.client.rpc.assert_called_once_with("search_analyses", {"search_topic": "robotics"})
+        self.client.table.assert_not_called()
+
+class TestVectorIndex(unittest.TestCase):
+    """Test the local similarity index"""
+    
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.index = VectorIndex(self.path)
+        self.index.add_many([
+            {"id": 1, "summary": "Neural networks are changing software.", "topics": ["machine learning", "software", "ai"], "keywords": ["networks"]},
+            {"id": 2, "summary": "The council approved a water budget.", "topics": ["government", "budget", "water"], "keywords": ["council"]}
+        ])
+    
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+    
+    def test_acronym_matches_phrase(self):
+        """Test that "ML" finds documents about machine learning"""
+        results = self.index.search("ML", k=5)
+        self.assertEqual([analysis_id for analysis_id, score in results], [1])
+    
+    def test_rows_shared_between_instances(self):
+        """Test that rows appended through one mapping are visible through another"""
+        other = VectorIndex(self.path)
+        other.add({"id": 3, "summary": "Hospital water supply", "topics": ["health"], "keywords": []})
+        
+        self.assertEqual(len(self.index), 3)
+        self.assertIn(3, [analysis_id for analysis_id, score in self.index.search("water", k=5)])
+    
+    def test_add_before_first_query_still_rebuilds(self):
+        """Test that an append on a fresh index doesn't suppress loading the history"""
+        path = tempfile.mkdtemp()
+        try:
+            index = VectorIndex(path)
+            index.add({"id": 3, "summary": "Hospital water supply", "topics": ["health"], "keywords": []})
+            self.assertFalse(index.is_built())
+            
+            index.rebuild([
+                {"id": 1, "summary": "Neural networks", "topics": ["machine learning"], "keywords": []},
+                {"id": 2, "summary": "Council budget", "topics": ["government"], "keywords": []}
+            ], only_if_unbuilt=True)
+            
+            self.assertTrue(index.is_built())
+            self.assertEqual(len(index), 3)
+            self.assertEqual([analysis_id for analysis_id, score in index.search("ML", k=5)], [1])
+            self.assertIn(3, [analysis_id for analysis_id, score in index.search("water", k=5)])
+            
+            index.rebuild([], only_if_unbuilt=True)
+            self.assertEqual(len(index), 3)
+            index.mark_stale()
+            self.assertFalse(index.is_built())
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    
+    def test_no_match_returns_empty(self):
+        """Test that unrelated queries return nothing"""
+        self.assertEqual(self.index.search("zebra", k=5), [])
+    
+    def test_out_of_vocabulary_on_large_index(self):
+        """Test that words absent from a few thousand documents match none of them"""
+        rng = random.Random(7)
+        vocabulary = [f"term{i}" for i in range(500)]
+        self.index.add_many([
+            {"id": i, "summary": " ".join(rng.choices(vocabulary, k=40)), "topics": rng.sample(vocabulary, 3), "keywords": []}
+            for i in range(3, 3003)
+        ])
+        
+        self.assertEqual(len(self.index.search("term7", k=10)), 10)
+        for query in ("zebra", "giraffe", "quantum computing"):
+            self.assertEqual(self.index.search(query, k=10), [])
+
+class TestSharedCache(unittest.TestCase):
+    """Test the cross-worker shared cache"""
+    
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = SharedCache(os.path.join(self.path, "cache.db"), max_entries=3)
+    
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+    
+    def test_set_and_get(self):
+        """Test that values are shared between cache instances and expire"""
+        self.cache.set("llm", "key", {"summary": "cached"}, ttl=60)
+        self.cache.set("llm", "old", {"summary": "stale"}, ttl=-1)
+        
+        other = SharedCache(self.cache.path)
+        self.assertEqual(other.get("llm", "key"), {"summary": "cached"})
+        self.assertIsNone(other.get("llm", "old"))
+        self.assertIsNone(other.get("search", "key"))
+    
+    def test_incr_counts_and_resets_after_expiry(self):
+        """Test the atomic counter used for rate limits"""
+        self.assertEqual(self.cache.incr("ratelimit", "llm", ttl=60), 1)
+        self.assertEqual(self.cache.incr("ratelimit", "llm", ttl=60, amount=2), 3)
+        
+        self.cache.incr("ratelimit", "expired", ttl=-1)
+        self.assertEqual(self.cache.incr("ratelimit", "expired", ttl=60), 1)
+    
+    def test_evict_keeps_max_entries(self):
+        """Test that eviction drops the entries closest to expiry"""
+        for i in range(5):
+            self.cache.set("search", str(i), i, ttl=100 + i)
+        self.cache.evict()
+        
+        self.assertEqual(self.cache.stats(), {"search": 3})
+        self.assertIsNone(self.cache.get("search", "0"))
+        self.assertEqual(self.cache.get("search", "4"), 4)
+    
+    def test_locked_cache_fails_fast(self):
+        """Test that a write lock held by another process surfaces quickly instead of stalling"""
+        cache = SharedCache(self.cache.path, busy_timeout=0.05)
+        locker = sqlite3.connect(self.cache.path, isolation_level=None)
+        locker.execute("BEGIN IMMEDIATE")
+        try:
+            start = time.monotonic()
+            with self.assertRaises(sqlite3.OperationalError):
+                cache.set("llm", "key", 1, ttl=60)
+            self.assertLess(time.monotonic() - start, 1.0)
+        finally:
+            locker.execute("ROLLBACK")
+            locker.close()
+    
+    def test_evict_keeps_counters(self):
+        """Test that capacity eviction never resets rate-limit or generation counters"""
+        for _ in range(3):
+            self.cache.incr("ratelimit", "llm:1", ttl=120)
+        self.cache.incr("counters", "search_generation", ttl=120)
+        for i in range(5):
+            self.cache.set("llm", str(i), i, ttl=86400)
+        self.cache.evict()
+        
+        self.assertEqual(self.cache.stats()["llm"], 3)
+        self.assertEqual(self.cache.incr("ratelimit", "llm:1", ttl=120), 4)
+        self.assertEqual(self.cache.get("counters", "search_generation"), 1)
+
+class TestProfiling(unittest.TestCase):
+    """Test per-request timing spans and slow request capture"""
+    
+    def test_spans_recorded_only_while_profiling(self):
+        """Test that profiled functions record spans only inside a profile"""
+        traced = profiled("test.double")(lambda x: x * 2)
+        
+        self.assertEqual(traced(2), 4)
+        token = start_profile(cpu_sampling=False)
+        traced(3)
+        traced(4)
+        profile = finish_profile(token)
+        traced(5)
+        
+        self.assertEqual([s["name"] for s in profile.spans], ["test.double", "test.double"])
+        self.assertIn("test.double", profile.span_totals())
+    
+    def test_server_timing_skips_metrics_set_by_endpoint(self):
+        """Test that a span already reported by the endpoint is not repeated"""
+        token = start_profile(cpu_sampling=False)
+        record_span("queue", 0.0125)
+        record_span("llm.analyze_text", 0.5)
+        profile = finish_profile(token)
+        
+        header = server_timing(profile, "queue;dur=12.5")
+        names = [metric.split(";")[0].strip() for metric in header.split(",")]
+        self.assertEqual(names, ["queue", "llm.analyze_text", "total"])
+        self.assertEqual(server_timing(profile).split(",")[0], "queue;dur=12.5")
+    
+    def test_log_rotation_shared_between_workers(self):
+        """Test that handlers in several workers keep one ordered, bounded log"""
+        path = tempfile.mkdtemp()
+        log_path = os.path.join(path, "slow_requests.log")
+        handlers = [SharedRotatingFileHandler(log_path, maxBytes=400, backupCount=2) for _ in range(2)]
+        try:
+            for i in range(60):
+                handlers[i % 2].emit(logging.makeLogRecord({"msg": f"record {i:02d} " + "x" * 30}))
+            
+            lines = []
+            for name in ("slow_requests.log.2", "slow_requests.log.1", "slow_requests.log"):
+                self.assertLessEqual(os.path.getsize(os.path.join(path, name)), 400)
+                with open(os.path.join(path, name)) as f:
+                    lines += [line.split()[1] for line in f]
+            self.assertEqual(lines, [f"{i:02d}" for i in range(60 - len(lines), 60)])
+        finally:
+            for handler in handlers:
+                handler.close()
+            shutil.rmtree(path, ignore_errors=True)
+    
+    def test_capture_slow_request(self):
+        """Test that only requests over the threshold are written to the log"""
+        token = start_profile(cpu_sampling=False)
+        profile = finish_profile(token)
+        
+        with patch('profiling.get_slow_request_logger') as mock_logger:
+            self.assertFalse(capture_slow_request(profile, "POST", "/analyze", 200, 10, threshold_ms=60000))
+            self.assertTrue(capture_slow_request(profile, "POST", "/analyze", 200, 10, threshold_ms=0))
+            
+            record = json.loads(mock_logger.return_value.info.call_args[0][0])
+            self.assertEqual(record["path"], "/analyze")
+            self.assertEqual(record["input_bytes"], 10)
+            self.assertNotIn("cpu_profile", record)
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,18 @@
+import hashlib
+from typing import Dict
+
+def text_hash(text: str) -> str:
+    """Return the content address (SHA-256 hex digest) of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_blob(text: str) -> Dict:
+    """
+    Build a text_blobs row for the given text.
+    The content is stored as plain TEXT: Postgres compresses large values
+    itself (TOAST), and plain text can still be searched server-side.
+    """
+    return {
+        "hash": text_hash(text),
+        "content": text,
+        "original_size": len(text.encode("utf-8"))
+    }
@@ -0,0 +1,306 @@
+import fcntl
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Terms stored per row. Longer documents keep their highest-weighted terms,
+# which always include the topics and keywords.
+DEFAULT_MAX_TERMS = int(os.getenv("VECTOR_INDEX_MAX_TERMS", "64"))
+DEFAULT_PATH = os.getenv(
+    "VECTOR_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vector_index")
+)
+
+# Topics and keywords describe the whole document, so they count more than
+# a single word from the summary.
+TOPIC_WEIGHT = 2
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
+    'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these',
+    'those', 'it', 'its', 'as', 'from', 'into', 'about', 'their', 'they', 'we', 'our', 'how'
+})
+
+# Header layout: number of rows, allocated rows, terms per row, whether the
+# index has been built from the full analyses table, and the file format
+_COUNT, _CAPACITY, _MAX_TERMS, _BUILT, _FORMAT = 0, 1, 2, 3, 4
+_HEADER_SIZE = 5
+_FORMAT_VERSION = 2
+_DATA_FILES = ("terms.u32", "weights.f32", "ids.i64")
+_INITIAL_CAPACITY = 1024
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOP_WORDS]
+
+def phrase_terms(phrase: str) -> List[str]:
+    """
+    Terms for a topic, keyword or query phrase.
+    Multi-word phrases also contribute their initials, so "machine learning"
+    and "ML" share a term.
+    """
+    words = tokenize(phrase)
+    terms = list(words)
+    if len(words) > 1:
+        terms.append("".join(word[0] for word in words))
+    return terms
+
+def analysis_terms(analysis: Dict) -> Counter:
+    """Weighted term counts for a stored analysis"""
+    counts = Counter(tokenize(analysis.get("summary") or ""))
+    for phrase in (analysis.get("topics") or []) + (analysis.get("keywords") or []):
+        for term in phrase_terms(str(phrase)):
+            counts[term] += TOPIC_WEIGHT
+    return counts
+
+def query_terms(query: str) -> Counter:
+    """Term counts for a free-text query"""
+    return Counter(phrase_terms(query))
+
+def term_hash(term: str) -> int:
+    """32-bit hash identifying a term in the index"""
+    return zlib.crc32(term.encode("utf-8"))
+
+def hashed_terms(counts: Counter, max_terms: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse row for term counts: up to max_terms term hashes and their weights,
+    padded with zero weights. Term frequencies are log-scaled, only the
+    highest-weighted terms are kept, and the kept weights are L2-normalised.
+    """
+    hashes = np.zeros(max_terms, dtype=np.uint32)
+    weights = np.zeros(max_terms, dtype=np.float32)
+    top = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:max_terms]
+    for slot, (term, count) in enumerate(top):
+        hashes[slot] = term_hash(term)
+        weights[slot] = 1.0 + math.log(count)
+    norm = np.linalg.norm(weights)
+    if norm > 0:
+        weights /= norm
+    return hashes, weights
+
+class VectorIndex:
+    """
+    Sparse TF-IDF vectors of stored analyses in memory-mapped files.
+    Each row holds the 32-bit hashes and weights of a document's terms, so
+    unrelated terms never share a slot the way they would in a small dense
+    hashed vector. All workers on a host map the same files, so rows appended
+    by one worker are visible to the others. Appends are serialised with a
+    file lock. Document frequencies are counted for the query's terms at
+    search time, so existing rows never have to be rewritten.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_terms: int = DEFAULT_MAX_TERMS):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock_path = os.path.join(path, "index.lock")
+
+        header_path = os.path.join(path, "header.i64")
+        with self._lock():
+            if not self._header_current(header_path):
+                # Missing or written by an older layout: start empty, the
+                # first query rebuilds it from the analyses table
+                for name in _DATA_FILES + ("vectors.f32", "df.i64"):
+                    if os.path.exists(self._file(name)):
+                        os.remove(self._file(name))
+                header = np.memmap(header_path, dtype=np.int64, mode="w+", shape=(_HEADER_SIZE,))
+                header[:] = (0, 0, max_terms, 0, _FORMAT_VERSION)
+                header.flush()
+                del header
+        self._header = np.memmap(header_path, dtype=np.int64, mode="r+", shape=(_HEADER_SIZE,))
+        self.max_terms = int(self._header[_MAX_TERMS])
+        self._capacity = -1
+        self._remap()
+
+    @staticmethod
+    def _header_current(header_path: str) -> bool:
+        if not os.path.exists(header_path) or os.path.getsize(header_path) != _HEADER_SIZE * 8:
+            return False
+        header = np.fromfile(header_path, dtype=np.int64)
+        return int(header[_FORMAT]) == _FORMAT_VERSION
+
+    @contextmanager
+    def _lock(self):
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _remap(self):
+        """Map the data files at the capacity currently recorded in the header"""
+        capacity = int(self._header[_CAPACITY])
+        if capacity == self._capacity:
+            return
+        shape = (capacity, self.max_terms)
+        if capacity == 0:
+            self._terms = np.zeros(shape, dtype=np.uint32)
+            self._weights = np.zeros(shape, dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+        else:
+            self._terms = np.memmap(self._file("terms.u32"), dtype=np.uint32, mode="r+", shape=shape)
+            self._weights = np.memmap(self._file("weights.f32"), dtype=np.float32, mode="r+", shape=shape)
+            self._ids = np.memmap(self._file("ids.i64"), dtype=np.int64, mode="r+", shape=(capacity,))
+        self._capacity = capacity
+
+    def _grow(self, required: int):
+        """Extend the data files to hold at least `required` rows. Caller holds the lock."""
+        capacity = int(self._header[_CAPACITY])
+        if required <= capacity:
+            return
+        new_capacity = max(_INITIAL_CAPACITY, capacity)
+        while new_capacity < required:
+            new_capacity *= 2
+        for name, row_bytes in zip(_DATA_FILES, (self.max_terms * 4, self.max_terms * 4, 8)):
+            with open(self._file(name), "ab") as f:
+                f.truncate(new_capacity * row_bytes)
+        self._header[_CAPACITY] = new_capacity
+        self._header.flush()
+
+    def __len__(self) -> int:
+        return int(self._header[_COUNT])
+
+    def _append(self, ids: np.ndarray, terms: np.ndarray, weights: np.ndarray,
+                reset: bool = False, only_if_unbuilt: bool = False):
+        """
+        Append pre-computed rows, or replace the contents and mark the index built.
+        Rows are written before the count is published, so concurrent readers
+        never see a partially written row.
+        """
+        with self._lock():
+            count = int(self._header[_COUNT])
+            if only_if_unbuilt and self._header[_BUILT]:
+                return
+            if reset:
+                # Keep rows appended after the rebuild's snapshot was read
+                self._remap()
+                high_water = int(ids.max()) if len(ids) else -1
+                newer = np.nonzero(self._ids[:count] > high_water)[0]
+                ids = np.concatenate([ids, np.array(self._ids[newer])])
+                terms = np.concatenate([terms, np.array(self._terms[newer])])
+                weights = np.concatenate([weights, np.array(self._weights[newer])])
+                count = 0
+            self._grow(count + len(ids))
+            self._remap()
+            end = count + len(ids)
+            if len(ids):
+                self._terms[count:end] = terms
+                self._weights[count:end] = weights
+                self._ids[count:end] = ids
+            if self._capacity > 0:
+                self._terms.flush()
+                self._weights.flush()
+                self._ids.flush()
+            self._header[_COUNT] = end
+            if reset:
+                self._header[_BUILT] = 1
+            self._header.flush()
+
+    def _vectorize(self, analyses: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        ids = np.array([a["id"] for a in analyses], dtype=np.int64)
+        terms = np.zeros((len(analyses), self.max_terms), dtype=np.uint32)
+        weights = np.zeros((len(analyses), self.max_terms), dtype=np.float32)
+        for row, analysis in enumerate(analyses):
+            terms[row], weights[row] = hashed_terms(analysis_terms(analysis), self.max_terms)
+        return ids, terms, weights
+
+    def add(self, analysis: Dict):
+        """Index a stored analysis"""
+        self.add_many([analysis])
+
+    def add_many(self, analyses: Iterable[Dict]):
+        """Index several stored analyses in one append"""
+        analyses = list(analyses)
+        if analyses:
+            self._append(*self._vectorize(analyses))
+
+    def is_built(self) -> bool:
+        """True once the index has been rebuilt from the full analyses table"""
+        return bool(self._header[_BUILT])
+
+    def mark_stale(self):
+        """Force a rebuild on next use, e.g. after a stored analysis failed to index"""
+        with self._lock():
+            self._header[_BUILT] = 0
+            self._header.flush()
+
+    def rebuild(self, analyses: Iterable[Dict], only_if_unbuilt: bool = False):
+        """
+        Replace the index contents with the given analyses and mark it built.
+        Rows already indexed with a higher id than any given analysis are kept,
+        since they were stored after the analyses were read.
+        With only_if_unbuilt, leave the index alone if another worker has
+        already built it.
+        """
+        ids, terms, weights = self._vectorize(list(analyses))
+        self._append(ids, terms, weights, reset=True, only_if_unbuilt=only_if_unbuilt)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Return up to k (analysis id, score) pairs most similar to the query,
+        best first. One vectorised scan over the term hashes finds every
+        occurrence of a query term; only those occurrences are scored. Query terms are weighted by their
+        smoothed IDF, counted over the same scan.
+        """
+        count = len(self)
+        if count == 0 or k <= 0:
+            return []
+        self._remap()
+
+        query_hashes, query_weights = hashed_terms(query_terms(query), self.max_terms)
+        present = query_weights > 0
+        query_hashes, query_weights = query_hashes[present], query_weights[present]
+        if not len(query_hashes):
+            return []
+
+        # Flattened rows: a 1-D scan and flatnonzero are much cheaper than 2-D nonzero
+        terms = self._terms[:count].reshape(-1)
+        mask = terms == query_hashes[0]
+        for h in query_hashes[1:]:
+            mask |= terms == h
+        matches = np.flatnonzero(mask)
+        if not len(matches):
+            return []
+
+        order = np.argsort(query_hashes)
+        slot = order[np.searchsorted(query_hashes[order], terms[matches])]
+        df = np.bincount(slot, minlength=len(query_hashes))
+        idf = np.log((1.0 + count) / (1.0 + df)) + 1.0
+        contributions = query_weights[slot] * idf[slot] ** 2 * self._weights[:count].reshape(-1)[matches]
+
+        scores = np.bincount(matches // self.max_terms, weights=contributions, minlength=count)
+        candidates = np.flatnonzero(scores > 0)
+        k = min(k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        seen = set()
+        for row in top:
+            analysis_id = int(self._ids[row])
+            if analysis_id in seen:
+                continue
+            seen.add(analysis_id)
+            results.append((analysis_id, float(scores[row])))
+        return results
+
+vector_index = None
+
+def get_vector_index() -> VectorIndex:
+    """Get or create the vector index for this process"""
+    global vector_index
+    if vector_index is None:
+        vector_index = VectorIndex()
+    return vector_index